@@ -1,28 +1,48 @@
 import os
 import json
+import logging
+import orjson
 import uuid
-import subprocess
-import io
 import base64
-import requests
-import math
-import tempfile
+import random
+import struct
+import hashlib
+import inspect
+import subprocess
+import threading
+import httpx
 import asyncio
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI
 import azure.cognitiveservices.speech as speechsdk
 from azure.storage.blob.aio import BlobServiceClient
 from azure.storage.blob import generate_blob_sas, BlobSasPermissions
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 # --- CONFIGURATION & INITIALIZATION ---
 load_dotenv()
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms up shared clients on startup and closes them on shutdown (the hooks are defined further down)."""
+    await ensure_blob_container()
+    await warm_up_synthesizers()
+    try:
+        yield
+    finally:
+        await close_blob_service_client()
+        await close_http_client()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 origins = ["http://localhost:5173", "http://127.0.0.1:5173"]
 app.add_middleware(
@@ -32,82 +52,419 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Pronunciation results carry per-phoneme detail for every word, so compress anything non-trivial.
+# Streamed and audio responses opt out with NO_COMPRESSION_HEADERS: gzip would buffer streams and gains nothing on PCM.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+NO_COMPRESSION_HEADERS = {"Content-Encoding": "identity"}
 
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 FFMPEG_PATH = r"C:\ffmpeg\ffmpeg-7.1.1-essentials_build\bin\ffmpeg.exe"
-FFPROBE_PATH = r"C:\ffmpeg\ffmpeg-7.1.1-essentials_build\bin\ffprobe.exe"
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 AZURE_STORAGE_CONTAINER_NAME = os.getenv("AZURE_STORAGE_CONTAINER_NAME")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION)
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+TTS_VOICE_NAME = "en-IN-NeerjaNeural"
 
-# --- HELPER FUNCTIONS ---
+logger = logging.getLogger("speech")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+# uvicorn doesn't configure the root logger, so without a handler of its own only warnings would get out
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(log_handler)
+    logger.propagate = False
 
-def convert_audio_with_ffmpeg(audio_bytes: bytes) -> bytes:
+# Shared keep-alive connection pool for Azure REST calls, so polling doesn't pay a TLS handshake per request
+http_client = httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=100, max_keepalive_connections=50))
+
+async def close_http_client():
+    await http_client.aclose()
+
+def create_blob_service_client():
+    """Builds the Blob Storage client, or returns None so a bad storage config only disables uploads."""
+    if not AZURE_STORAGE_CONNECTION_STRING:
+        return None
     try:
-        ffmpeg_command = [FFMPEG_PATH, '-i', 'pipe:0', '-ac', '1', '-ar', '16000', '-f', 'wav', 'pipe:1']
-        process = subprocess.run(ffmpeg_command, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        return process.stdout
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"FFmpeg failed: {e.stderr.decode()}")
+        return BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
+    except Exception:
+        logger.exception("Invalid AZURE_STORAGE_CONNECTION_STRING; audio uploads are disabled")
+        return None
+
+# One Blob Storage client for the app's lifetime, instead of a new client (and connection pool) per upload
+blob_service_client = create_blob_service_client()
+# The container client shares the service client's connection pool, so only the service client is closed
+blob_container_client = blob_service_client.get_container_client(AZURE_STORAGE_CONTAINER_NAME) if blob_service_client and AZURE_STORAGE_CONTAINER_NAME else None
+# SAS tokens are signed with the account key, so resolve it once rather than per upload
+AZURE_STORAGE_ACCOUNT_NAME = blob_service_client.account_name if blob_service_client else None
+# SAS-based connection strings carry no account key, so uploads report storage as not configured
+AZURE_STORAGE_ACCOUNT_KEY = getattr(blob_service_client.credential, "account_key", None) if blob_service_client else None
+
+async def ensure_blob_container():
+    """Creates the upload container once at startup instead of on every upload."""
+    if blob_container_client:
+        try:
+            await blob_container_client.create_container()
+        except Exception:
+            pass # Container likely already exists
 
-def get_pronunciation_assessment(wav_data: bytes, reference_text: str) -> dict:
-    endpoint = f"https://{AZURE_SPEECH_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US"
+async def close_blob_service_client():
+    if blob_service_client:
+        await blob_service_client.close()
+
+# --- HELPER FUNCTIONS ---
+
+# Large pipe reads/writes mean far fewer syscalls (and drain round-trips) per multi-MB WAV
+FFMPEG_PIPE_CHUNK_SIZE = 1024 * 1024
+
+def is_target_wav(header: bytes) -> bool:
+    """Returns True if the bytes start with a 16 kHz, mono, 16-bit PCM WAV header."""
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return False
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack_from('<I', header, offset + 4)[0]
+        if chunk_id == b'fmt ':
+            if offset + 24 > len(header):
+                return False
+            audio_format, channels, sample_rate = struct.unpack_from('<HHI', header, offset + 8)
+            bits_per_sample = struct.unpack_from('<H', header, offset + 22)[0]
+            return (audio_format, channels, sample_rate, bits_per_sample) == (1, 1, 16000, 16)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return False
+
+WAV_BYTES_PER_SECOND = 16000 * 2 # 16 kHz, mono, 16-bit
+
+def find_wav_data_chunk(wav_data: bytes) -> tuple:
+    """Returns (offset, size) of the PCM samples, or (-1, 0) if there is no data chunk.
+
+    ffmpeg writing to a pipe can't go back and fill in the header's size fields, so a
+    placeholder size (0 or 0xFFFFFFFF) is taken to mean the samples run to the end.
+    """
+    offset = 12
+    while offset + 8 <= len(wav_data):
+        chunk_size = struct.unpack_from('<I', wav_data, offset + 4)[0]
+        if wav_data[offset:offset + 4] == b'data':
+            data_offset = offset + 8
+            available_size = len(wav_data) - data_offset
+            if chunk_size in (0, 0xFFFFFFFF):
+                return data_offset, available_size
+            # Trailing chunks such as LIST or id3 after the samples are not audio
+            return data_offset, min(chunk_size, available_size)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return -1, 0
+
+def fill_wav_header_sizes(wav_data: bytes) -> bytes:
+    """Writes the real RIFF and data sizes into a WAV header that ffmpeg left as pipe placeholders."""
+    data_offset, data_size = find_wav_data_chunk(wav_data)
+    if data_offset < 0 or struct.unpack_from('<I', wav_data, data_offset - 4)[0] not in (0, 0xFFFFFFFF):
+        return wav_data
+    header = bytearray(wav_data[:data_offset])
+    struct.pack_into('<I', header, 4, len(wav_data) - 8)
+    struct.pack_into('<I', header, data_offset - 4, data_size)
+    return bytes(header) + wav_data[data_offset:]
+
+def get_wav_duration(wav_data: bytes) -> float:
+    """Returns the duration of 16 kHz mono 16-bit WAV bytes."""
+    _, data_size = find_wav_data_chunk(wav_data)
+    return data_size / WAV_BYTES_PER_SECOND
+
+def split_wav(wav_data: bytes, chunk_length_seconds: int) -> list:
+    """Slices 16 kHz mono 16-bit WAV bytes into standalone WAV chunks, without another ffmpeg pass."""
+    data_offset, data_size = find_wav_data_chunk(wav_data)
+    if data_offset < 0:
+        return []
+    pcm = memoryview(wav_data)[data_offset:data_offset + data_size]
+    chunk_size = chunk_length_seconds * WAV_BYTES_PER_SECOND
+    chunk_wavs = []
+    for start in range(0, len(pcm), chunk_size):
+        samples = pcm[start:start + chunk_size]
+        header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(samples), b'WAVE', b'fmt ', 16, 1, 1, 16000, WAV_BYTES_PER_SECOND, 2, 16, b'data', len(samples))
+        chunk_wavs.append(header + samples)
+    return chunk_wavs
+
+def run_ffmpeg_conversion(first_chunk: bytes, source) -> tuple:
+    """Streams first_chunk plus the rest of source through ffmpeg; returns (returncode, wav_data, stderr).
+
+    A blocking Popen driven from a worker thread, rather than an asyncio subprocess, because
+    uvicorn's Windows selector loop (used with --reload/--workers) can't spawn subprocesses.
+    """
+    ffmpeg_command = [FFMPEG_PATH, '-i', 'pipe:0', '-ac', '1', '-ar', '16000', '-f', 'wav', 'pipe:1']
+    process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=FFMPEG_PIPE_CHUNK_SIZE)
+    # The writer thread owns stdin, so communicate() below only drains stdout/stderr and neither pipe can stall
+    stdin, process.stdin = process.stdin, None
+
+    def feed_stdin():
+        try:
+            stdin.write(first_chunk)
+            while chunk := source.read(FFMPEG_PIPE_CHUNK_SIZE):
+                stdin.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # ffmpeg exited early; its stderr says why
+        finally:
+            try:
+                stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    writer = threading.Thread(target=feed_stdin, daemon=True)
+    writer.start()
+    wav_data, stderr = process.communicate()
+    writer.join()
+    return process.returncode, wav_data, stderr
+
+async def convert_audio_with_ffmpeg(audio_file: UploadFile) -> bytes:
+    """Pipes the upload into ffmpeg chunk by chunk and returns 16 kHz mono WAV bytes."""
+    first_chunk = await audio_file.read(FFMPEG_PIPE_CHUNK_SIZE)
+    # Uploads that are already in the target format don't need a transcode at all
+    if is_target_wav(first_chunk):
+        return first_chunk + await audio_file.read()
+
+    returncode, wav_data, stderr = await asyncio.to_thread(run_ffmpeg_conversion, first_chunk, audio_file.file)
+    if returncode != 0:
+        raise HTTPException(status_code=500, detail=f"FFmpeg failed: {stderr.decode()}")
+    return wav_data
+
+# Azure results are deterministic for the same audio (and reference text), so re-submitted clips are served from memory
+RESULT_CACHE_TTL_SECONDS = 3600
+pronunciation_cache = TTLCache(maxsize=1024, ttl=RESULT_CACHE_TTL_SECONDS)
+stt_cache = TTLCache(maxsize=1024, ttl=RESULT_CACHE_TTL_SECONDS)
+
+@lru_cache(maxsize=1024)
+def get_pronunciation_assessment_header(reference_text: str) -> str:
+    """Builds the base64 Pronunciation-Assessment header; retries of the same text reuse it."""
     params = {"ReferenceText": reference_text, "GradingSystem": "HundredMark", "Granularity": "Phoneme", "EnableMiscue": "True"}
-    params_json = json.dumps(params)
-    params_base64 = base64.b64encode(params_json.encode('utf-8')).decode('utf-8')
-    headers = {'Content-Type': 'audio/wav; codecs=audio/pcm; samplerate=16000', 'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY, 'Pronunciation-Assessment': params_base64, 'Accept': 'application/json;text/xml'}
+    # Compact separators give a shorter header once base64-encoded
+    return base64.b64encode(json.dumps(params, separators=(",", ":")).encode('utf-8')).decode('ascii')
+
+# Only the assessment header varies per call, so the rest is built once
+PRONUNCIATION_REQUEST_HEADERS = {'Content-Type': 'audio/wav; codecs=audio/pcm; samplerate=16000', 'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY, 'Accept': 'application/json;text/xml'}
+STT_REQUEST_HEADERS = {'Content-Type': 'audio/wav', 'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY, 'Accept': 'application/json'}
+
+async def get_pronunciation_assessment(wav_data: bytes, reference_text: str) -> dict:
+    endpoint = f"https://{AZURE_SPEECH_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US"
+    cache_key = (hashlib.sha256(wav_data).digest(), reference_text)
+    cached_result = pronunciation_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    headers = {**PRONUNCIATION_REQUEST_HEADERS, 'Pronunciation-Assessment': get_pronunciation_assessment_header(reference_text)}
     try:
-        response = requests.post(url=endpoint, headers=headers, data=wav_data)
+        response = await http_client.post(endpoint, headers=headers, content=wav_data)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=502, detail=f"Azure Pronunciation API Error: {e.response.text if e.response else str(e)}")
-
-def get_stt_result(wav_data: bytes) -> dict:
+        result = orjson.loads(response.content)
+        pronunciation_cache[cache_key] = result
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Azure Pronunciation API Error: {e.response.text if isinstance(e, httpx.HTTPStatusError) else str(e)}")
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=502, detail=f"Azure Pronunciation API returned invalid JSON: {str(e)}")
+
+STT_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+STT_MAX_RETRIES = 3
+STT_RETRY_INITIAL_BACKOFF_SECONDS = 0.5
+
+async def get_stt_result(wav_data: bytes) -> dict:
     endpoint = f"https://{AZURE_SPEECH_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US&format=detailed"
-    headers = {'Content-Type': 'audio/wav', 'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY, 'Accept': 'application/json'}
+    cache_key = hashlib.sha256(wav_data).digest()
+    cached_result = stt_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
     try:
-        response = requests.post(url=endpoint, headers=headers, data=wav_data)
+        backoff_seconds = STT_RETRY_INITIAL_BACKOFF_SECONDS
+        for attempt in range(STT_MAX_RETRIES + 1):
+            response = await http_client.post(endpoint, headers=STT_REQUEST_HEADERS, content=wav_data)
+            if response.status_code not in STT_RETRY_STATUS_CODES or attempt == STT_MAX_RETRIES:
+                break
+            # Throttled or transient Azure error: back off exponentially and try again
+            await asyncio.sleep(backoff_seconds)
+            backoff_seconds *= 2
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=502, detail=f"Azure STT API Error: {e.response.text if e.response else str(e)}")
+        result = orjson.loads(response.content)
+        stt_cache[cache_key] = result
+        return result
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Azure STT API Error: {e.response.text if isinstance(e, httpx.HTTPStatusError) else str(e)}")
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=502, detail=f"Azure STT API returned invalid JSON: {str(e)}")
         
-# --- NEW ASYNC HELPER FOR A SINGLE CHUNK ---
-async def process_chunk_async(chunk_data: bytes) -> dict:
-    """Asynchronously calls the STT API for a single chunk of audio."""
-    # In a real-world scenario with high traffic, you might use an async HTTP client like httpx.
-    # For our MVP, running the synchronous `requests` call in an async executor is a robust solution.
-    loop = asyncio.get_event_loop()
-    stt_result = await loop.run_in_executor(None, get_stt_result, chunk_data)
-    return stt_result
-
-def get_ai_coach_feedback(transcript: str, topic: str, duration_seconds: float, word_count: int) -> dict:
-    if not openai_client:
-        return {"error": "OpenAI client not configured."}
-    
-    words_per_minute = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
+# Synthesizers are expensive to build and each one handles a single synthesis at a time,
+# so every voice gets a small pool that concurrent requests check instances out of
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", "4"))
+_synthesizer_pools = {}
+
+def get_synthesizer_pool(voice_name: str) -> asyncio.Queue:
+    """Returns the synthesizer pool for a voice, building it on first use."""
+    pool = _synthesizer_pools.get(voice_name)
+    if pool is None:
+        # Each voice gets its own SpeechConfig so requests never mutate shared state
+        voice_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION)
+        voice_config.speech_synthesis_voice_name = voice_name
+        pool = asyncio.Queue()
+        for _ in range(TTS_POOL_SIZE):
+            # audio_config=None keeps the audio in memory instead of opening a speaker on the server
+            pool.put_nowait(speechsdk.SpeechSynthesizer(speech_config=voice_config, audio_config=None))
+        _synthesizer_pools[voice_name] = pool
+    return pool
+
+# Connection objects are kept referenced so the pre-opened TTS websockets stay up
+_synthesizer_connections = []
+
+async def warm_up_synthesizers():
+    """Builds the default voice's pool and opens its Azure connections before the first request."""
+    if not AZURE_SPEECH_KEY:
+        return
+    pool = get_synthesizer_pool(TTS_VOICE_NAME)
+    synthesizers = [pool.get_nowait() for _ in range(pool.qsize())]
+    try:
+        for synthesizer in synthesizers:
+            connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+            await asyncio.to_thread(connection.open, True)
+            _synthesizer_connections.append(connection)
+    except Exception:
+        pass # Warm-up is best effort; the first synthesis connects on demand
+    finally:
+        for synthesizer in synthesizers:
+            pool.put_nowait(synthesizer)
+
+# Word and paragraph TTS share the pools, so a request waits this long for a free synthesizer before giving up
+TTS_POOL_CHECKOUT_TIMEOUT_SECONDS = 30
+
+async def checkout_synthesizer(pool: asyncio.Queue) -> speechsdk.SpeechSynthesizer:
+    """Takes a synthesizer out of a pool, or raises a 503 if none frees up in time."""
+    try:
+        return await asyncio.wait_for(pool.get(), TTS_POOL_CHECKOUT_TIMEOUT_SECONDS)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="All speech synthesizers are busy. Please try again.")
+
+@asynccontextmanager
+async def acquire_synthesizer(voice_name: str):
+    """Checks a synthesizer out of the voice's pool for the duration of the block."""
+    pool = get_synthesizer_pool(voice_name)
+    synthesizer = await checkout_synthesizer(pool)
+    try:
+        yield synthesizer
+    finally:
+        pool.put_nowait(synthesizer)
+
+TTS_STREAM_CHUNK_SIZE = 3200  # 100 ms of 16 kHz 16-bit mono audio
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """A StreamingResponse that calls on_close once it is done sending.
+
+    Cleanup in the body generator's own finally is not enough: if the client disconnects
+    before the body starts, Starlette never iterates the generator, so its finally never runs.
+    on_close may be a coroutine function; it is shielded so a disconnect can't cancel the cleanup.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
 
-    # --- FINAL MVP "SENIOR ENGLISH TUTOR" PROMPT ---
-    prompt = f"""
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            closing = self.on_close()
+            if inspect.isawaitable(closing):
+                await asyncio.shield(closing)
+
+async def stream_synthesized_speech(text: str) -> StreamingResponse:
+    """Starts TTS and streams the audio to the client as the synthesizer produces it."""
+    pool = get_synthesizer_pool(TTS_VOICE_NAME)
+    synthesizer = await checkout_synthesizer(pool)
+    try:
+        # start_speaking returns as soon as the first audio arrives, not when synthesis is finished
+        result = await asyncio.to_thread(lambda: synthesizer.start_speaking_text_async(text).get())
+        if result.reason == speechsdk.ResultReason.Canceled:
+            raise HTTPException(status_code=500, detail=f"TTS Canceled: {result.cancellation_details.reason}")
+    except BaseException:
+        pool.put_nowait(synthesizer)
+        raise
+    audio_stream = speechsdk.AudioDataStream(result)
+    # The synthesizer stays checked out until its audio has been fully streamed or the response is abandoned
+    reached_end = False
+    released = False
+
+    def release_after_stop(stopping: asyncio.Future):
+        if not stopping.cancelled():
+            stopping.exception() # Retrieved so a failed stop isn't logged as unhandled; the synthesizer is reusable either way
+        pool.put_nowait(synthesizer)
+
+    def release_synthesizer():
+        nonlocal released
+        if released:
+            return
+        released = True
+        if reached_end:
+            pool.put_nowait(synthesizer)
+        else:
+            # The client left mid-paragraph (or before the body started): stop the abandoned synthesis in a
+            # worker thread before the synthesizer goes back to the pool. Not awaited, since the request is being torn down.
+            stopping = asyncio.get_running_loop().run_in_executor(None, lambda: synthesizer.stop_speaking_async().get())
+            stopping.add_done_callback(release_after_stop)
+
+    async def audio_chunks():
+        nonlocal reached_end
+        buffer = bytes(TTS_STREAM_CHUNK_SIZE)
+        while True:
+            filled_size = await asyncio.to_thread(audio_stream.read_data, buffer)
+            if filled_size == 0:
+                break
+            yield buffer[:filled_size]
+        reached_end = True
+
+    return ReleasingStreamingResponse(audio_chunks(), release_synthesizer, media_type="audio/wav", headers=NO_COMPRESSION_HEADERS)
+
+# Vocabulary words are synthesized over and over, so keep their audio in memory (and in the browser)
+TTS_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable", **NO_COMPRESSION_HEADERS}
+# Bounded by total WAV bytes rather than entry count, and only short texts are accepted for word audio
+TTS_AUDIO_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TTS_WORD_MAX_LENGTH = 100
+tts_audio_cache = LRUCache(maxsize=TTS_AUDIO_CACHE_MAX_BYTES, getsizeof=len)
+
+async def synthesize_cached(voice_name: str, text: str) -> bytes:
+    """Synthesizes short text to WAV bytes, serving repeats from the cache."""
+    cache_key = (voice_name, text)
+    audio_data = tts_audio_cache.get(cache_key)
+    if audio_data is not None:
+        return audio_data
+    async with acquire_synthesizer(voice_name) as synthesizer:
+        result = await asyncio.to_thread(lambda: synthesizer.speak_text_async(text).get())
+    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        raise HTTPException(status_code=500, detail=f"TTS Canceled: {result.cancellation_details.reason}")
+    tts_audio_cache[cache_key] = result.audio_data
+    return result.audio_data
+
+# Caps in-flight chunk STT calls across all requests; a long recording would otherwise trip Azure throttling
+STT_SEMAPHORE = asyncio.Semaphore(int(os.getenv("STT_CONCURRENCY", "16")))
+
+# --- NEW ASYNC HELPER FOR A SINGLE CHUNK ---
+async def process_chunk_async(chunk_data: bytes) -> tuple:
+    """Transcribes a single chunk of audio and returns (display_text, word_count)."""
+    async with STT_SEMAPHORE:
+        result = await get_stt_result(chunk_data)
+    # Keep only what the transcript needs, so the full STT payloads aren't all held until the join
+    return result.get("DisplayText", ""), len(result.get("NBest", [{}])[0].get("Words", []))
+
+# --- FINAL MVP "SENIOR ENGLISH TUTOR" PROMPT ---
+# Static rubric + JSON schema sent byte-for-byte identically on every call, so OpenAI can cache it as a prompt prefix.
+# The per-speech details go in the user message after it.
+COACH_SYSTEM_PROMPT = """
     You are an expert, encouraging, and insightful Senior English Tutor providing a detailed analysis of an impromptu speech.
-    The user's task was to speak on the topic: "{topic}".
-    The transcript is: "{transcript}"
+    The user message gives the topic the student was asked to speak on, the speech's duration and pace, and the transcript.
 
     Your task is to provide a comprehensive, personalized, and actionable evaluation in a valid JSON object.
     You MUST provide a value for every key. For arrays, return all items you find; if none, return an empty array.
 
     Here is the required JSON structure. Follow it with 100% accuracy:
-    {{
+    {
         "fluency_score": <integer>,
         "fluency_feedback": "<string: Personalized comment on pace and rhythm.>",
         "grammar_score": <integer>,
         "grammar_errors": [
-            {{"error": "<string: Phrase with error>", "correction": "<string: Corrected phrase>", "explanation": "<string: Simple explanation>"}}
+            {"error": "<string: Phrase with error>", "correction": "<string: Corrected phrase>", "explanation": "<string: Simple explanation>"}
         ],
         "vocabulary_score": <integer>,
         "vocabulary_feedback": "<string: Personalized comment on word choice. Suggest 1-2 better words.>",
@@ -119,73 +476,153 @@ def get_ai_coach_feedback(transcript: str, topic: str, duration_seconds: float,
             "<string: A specific, positive, and encouraging comment.>"
         ],
         "rewritten_sample": "<string: Rewrite the user's ENTIRE speech into an improved version of a SIMILAR LENGTH at an appropriate, slightly more advanced level.>"
-    }}
+    }
     """
+
+# Retries and reloads of the same speech reuse the earlier coach analysis instead of another OpenAI call
+coach_feedback_cache = TTLCache(maxsize=4096, ttl=RESULT_CACHE_TTL_SECONDS)
+
+def get_coach_cache_key(transcript: str, topic: str, duration_seconds: float, word_count: int) -> bytes:
+    # Case and spacing differences between transcripts of the same speech shouldn't miss the cache
+    normalized_transcript = " ".join(transcript.lower().split())
+    return hashlib.blake2b(f"{topic}|{normalized_transcript}|{round(duration_seconds, 1)}|{word_count}".encode('utf-8'), digest_size=16).digest()
+
+COACH_MODEL = os.getenv("COACH_MODEL", "gpt-4o-mini")
+
+# Structured outputs: the API enforces the same JSON structure the system prompt describes
+COACH_FEEDBACK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "fluency_score": {"type": "integer"},
+        "fluency_feedback": {"type": "string"},
+        "grammar_score": {"type": "integer"},
+        "grammar_errors": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"error": {"type": "string"}, "correction": {"type": "string"}, "explanation": {"type": "string"}},
+                "required": ["error", "correction", "explanation"],
+                "additionalProperties": False,
+            },
+        },
+        "vocabulary_score": {"type": "integer"},
+        "vocabulary_feedback": {"type": "string"},
+        "coherence_score": {"type": "integer"},
+        "coherence_feedback": {"type": "string"},
+        "argument_strength_analysis": {"type": "string"},
+        "structural_blueprint": {"type": "string"},
+        "positive_highlights": {"type": "array", "items": {"type": "string"}},
+        "rewritten_sample": {"type": "string"},
+    },
+    "required": [
+        "fluency_score", "fluency_feedback", "grammar_score", "grammar_errors",
+        "vocabulary_score", "vocabulary_feedback", "coherence_score", "coherence_feedback",
+        "argument_strength_analysis", "structural_blueprint", "positive_highlights", "rewritten_sample",
+    ],
+    "additionalProperties": False,
+}
+COACH_RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "coach_feedback", "strict": True, "schema": COACH_FEEDBACK_SCHEMA}}
+
+def build_coach_messages(transcript: str, topic: str, duration_seconds: float, word_count: int) -> list:
+    words_per_minute = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
+    speech_details = f'Topic: "{topic}"\nDuration: {duration_seconds:.1f} seconds\nWords per minute: {words_per_minute:.0f}\nTranscript: "{transcript}"'
+    return [{"role": "system", "content": COACH_SYSTEM_PROMPT}, {"role": "user", "content": speech_details}]
+
+async def get_ai_coach_feedback(transcript: str, topic: str, duration_seconds: float, word_count: int) -> dict:
+    if not openai_client:
+        return {"error": "OpenAI client not configured."}
+    
+    cache_key = get_coach_cache_key(transcript, topic, duration_seconds, word_count)
+    cached_feedback = coach_feedback_cache.get(cache_key)
+    if cached_feedback is not None:
+        return cached_feedback
+
     try:
-        response = openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "system", "content": prompt}], response_format={"type": "json_object"})
+        response = await openai_client.chat.completions.create(model=COACH_MODEL, messages=build_coach_messages(transcript, topic, duration_seconds, word_count), response_format=COACH_RESPONSE_FORMAT)
         try:
-            return json.loads(response.choices[0].message.content)
-        except json.JSONDecodeError:
+            feedback = orjson.loads(response.choices[0].message.content)
+        except orjson.JSONDecodeError:
             raise HTTPException(status_code=500, detail="OpenAI returned malformed JSON.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API Error: {str(e)}")
+    coach_feedback_cache[cache_key] = feedback
+    return feedback
+
+async def open_ai_coach_stream(transcript: str, topic: str, duration_seconds: float, word_count: int):
+    """Starts the coach completion and returns (async iterator over its JSON text, async close function).
+
+    The OpenAI request is made here, before any bytes are sent to the client, so
+    errors such as a bad key still surface as a normal exception. The caller must
+    await close once done, so an abandoned stream doesn't keep its connection open
+    and OpenAI doesn't keep generating billed tokens.
+    """
+    cache_key = get_coach_cache_key(transcript, topic, duration_seconds, word_count)
+    cached_feedback = coach_feedback_cache.get(cache_key)
+    if cached_feedback is not None:
+        async def cached_chunks():
+            yield orjson.dumps(cached_feedback).decode()
+        async def close_nothing():
+            pass
+        return cached_chunks(), close_nothing
+
+    stream = await openai_client.chat.completions.create(model=COACH_MODEL, messages=build_coach_messages(transcript, topic, duration_seconds, word_count), response_format=COACH_RESPONSE_FORMAT, stream=True)
+
+    async def completion_chunks():
+        content_parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                content_parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        # Validate the complete document at the end; only well-formed feedback is cached
+        try:
+            coach_feedback_cache[cache_key] = orjson.loads("".join(content_parts))
+        except orjson.JSONDecodeError:
+            pass
+
+    return completion_chunks(), stream.close
 
 # --- NEW, CORRECTED VERSION of upload_audio_to_blob ---
 async def upload_audio_to_blob(audio_bytes: bytes) -> str:
     """Uploads audio to Azure Blob Storage and returns the SAS URL."""
-    connect_str = AZURE_STORAGE_CONNECTION_STRING
-    container_name = AZURE_STORAGE_CONTAINER_NAME
-    if not connect_str or not container_name:
+    if not blob_container_client or not AZURE_STORAGE_ACCOUNT_KEY:
         raise HTTPException(status_code=500, detail="Azure Storage not configured.")
 
-    blob_service_client = BlobServiceClient.from_connection_string(connect_str)
-    
     blob_name = f"impromptu_{uuid.uuid4()}.wav"
-    
-    async with blob_service_client.get_container_client(container_name) as container_client:
-        # Create container if it doesn't exist
-        try:
-            await container_client.create_container()
-        except Exception:
-            pass # Container likely already exists
-
-        blob_client = container_client.get_blob_client(blob_name)
-        await blob_client.upload_blob(io.BytesIO(audio_bytes), overwrite=True)
-
-        # Generate SAS token using the account key
-        account_name = blob_service_client.account_name
-        account_key = blob_service_client.credential.account_key
-        
-        sas_token = generate_blob_sas(
-            account_name=account_name,
-            account_key=account_key,
-            container_name=container_name,
-            blob_name=blob_name,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=4)
-        )
-        return f"{blob_client.url}?{sas_token}"
+    blob_client = blob_container_client.get_blob_client(blob_name)
+    # Raw bytes avoid an extra stream copy. Below the SDK's 64 MiB max_single_put_size (about 35 min of
+    # 16 kHz mono audio) this is a single PUT; only longer recordings are split into blocks, 4 in flight at a time
+    await blob_client.upload_blob(audio_bytes, overwrite=True, length=len(audio_bytes), max_concurrency=4)
+
+    # Generate SAS token using the account key
+    sas_token = generate_blob_sas(
+        account_name=AZURE_STORAGE_ACCOUNT_NAME,
+        account_key=AZURE_STORAGE_ACCOUNT_KEY,
+        container_name=AZURE_STORAGE_CONTAINER_NAME,
+        blob_name=blob_name,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.now(timezone.utc) + timedelta(hours=4)
+    )
+    return f"{blob_client.url}?{sas_token}"
 
 # --- API ENDPOINTS ---
 @app.post("/api/analyze")
 async def analyze_speech(mode: str = Query(...), audio_file: UploadFile = File(...), reference_text: str = Form(None), topic: str = Form(None)):
-    audio_bytes = await audio_file.read()
-    wav_data = convert_audio_with_ffmpeg(audio_bytes)
+    wav_data = await convert_audio_with_ffmpeg(audio_file)
     if mode == 'pronunciation':
         if not reference_text: raise HTTPException(status_code=400, detail="Reference text required.")
-        azure_data = get_pronunciation_assessment(wav_data, reference_text)
-        return JSONResponse(content={"mode": "pronunciation", "azureAssessment": azure_data.get("NBest")[0]})
+        azure_data = await get_pronunciation_assessment(wav_data, reference_text)
+        return ORJSONResponse(content={"mode": "pronunciation", "azureAssessment": azure_data.get("NBest")[0]})
     elif mode == 'impromptu':
         if not topic: raise HTTPException(status_code=400, detail="Topic is required.")
-        stt_result = get_stt_result(wav_data)
+        stt_result = await get_stt_result(wav_data)
         transcript = stt_result.get("DisplayText", "")
         if not transcript: raise HTTPException(status_code=400, detail="Could not detect speech.")
         nbest = stt_result.get("NBest", [{}])[0]
         duration_seconds = nbest.get("Duration", 0) / 10000000.0
         word_count = len(nbest.get("Words", []))
-        ai_coach_analysis = get_ai_coach_feedback(transcript, topic, duration_seconds, word_count)
+        ai_coach_analysis = await get_ai_coach_feedback(transcript, topic, duration_seconds, word_count)
         final_result = { "mode": "impromptu", "transcript": transcript, "azureMetrics": { "wordCount": word_count, "duration": duration_seconds }, "aiCoachAnalysis": ai_coach_analysis }
-        return JSONResponse(content=final_result)
+        return ORJSONResponse(content=final_result)
     else:
         raise HTTPException(status_code=400, detail="Invalid analysis mode specified.")
 
@@ -193,18 +630,10 @@ async def analyze_speech(mode: str = Query(...), audio_file: UploadFile = File(.
 @app.get("/api/synthesize")
 async def synthesize_speech(word: str):
     if not word: raise HTTPException(status_code=400, detail="No word provided.")
+    if len(word) > TTS_WORD_MAX_LENGTH: raise HTTPException(status_code=400, detail="Text too long; use /api/synthesize-paragraph.")
     
-    # Set the desired Indian English voice
-    speech_config.speech_synthesis_voice_name = "en-IN-NeerjaNeural"
-    
-    # Use default audio output configuration for streaming
-    audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
-    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-    result = synthesizer.speak_text_async(word).get()
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        return StreamingResponse(io.BytesIO(result.audio_data), media_type="audio/wav")
-    else:
-        raise HTTPException(status_code=500, detail=f"TTS Canceled: {result.cancellation_details.reason}")
+    audio_data = await synthesize_cached(TTS_VOICE_NAME, word)
+    return Response(content=audio_data, media_type="audio/wav", headers=TTS_CACHE_HEADERS)
 
 # NEW Pydantic model for the paragraph request body
 class TextToSynthesize(BaseModel):
@@ -216,92 +645,78 @@ async def synthesize_paragraph(item: TextToSynthesize):
     if not item.text:
         raise HTTPException(status_code=400, detail="No text provided.")
     
-    # Set the desired Indian English voice
-    speech_config.speech_synthesis_voice_name = "en-IN-NeerjaNeural"
-    
-    # Use default audio output configuration for streaming
-    audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
-    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-    result = synthesizer.speak_text_async(item.text).get()
-
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        return StreamingResponse(io.BytesIO(result.audio_data), media_type="audio/wav")
-    else:
-        raise HTTPException(status_code=500, detail=f"TTS Canceled: {result.cancellation_details.reason}")
+    return await stream_synthesized_speech(item.text)
+
+# Pydantic model for the streaming coach request body
+class CoachRequest(BaseModel):
+    transcript: str
+    topic: str
+    duration: float
+    wordCount: int
+
+# Streams the AI coach's JSON as it is generated, so the UI can render feedback before the full response is done
+@app.post("/api/coach/stream")
+async def stream_coach_feedback(item: CoachRequest):
+    if not openai_client:
+        raise HTTPException(status_code=500, detail="OpenAI client not configured.")
+    if not item.transcript:
+        raise HTTPException(status_code=400, detail="No transcript provided.")
+    try:
+        coach_chunks, close_coach_stream = await open_ai_coach_stream(item.transcript, item.topic, item.duration, item.wordCount)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OpenAI API Error: {str(e)}")
+    return ReleasingStreamingResponse(coach_chunks, close_coach_stream, media_type="application/json", headers=NO_COMPRESSION_HEADERS)
 
 @app.post("/api/analyze-chunked")
 async def analyze_chunked_speech(audio_file: UploadFile = File(...), topic: str = Form(...)):
     """
     Analyzes audio by processing chunks in parallel for maximum speed.
     """
-    audio_bytes = await audio_file.read()
-    if not audio_bytes:
+    if audio_file.size == 0:
         raise HTTPException(status_code=400, detail="The submitted audio file is empty.")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_in, \
-         tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_out:
-        temp_in.write(audio_bytes)
-        temp_in_path = temp_in.name
-        temp_out_path = temp_out.name
-    
-    try:
-        # Step 1: Convert to WAV and get duration (same as before)
-        convert_command = [ FFMPEG_PATH, '-i', temp_in_path, '-ac', '1', '-ar', '16000', temp_out_path, '-y' ]
-        subprocess.run(convert_command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        ffprobe_command = [FFPROBE_PATH, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', temp_out_path]
-        duration_result = subprocess.run(ffprobe_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        duration_seconds = float(duration_result.stdout.strip().decode())
-
-        # Step 2: Create audio chunks (same as before)
-        chunk_length_seconds = 45
-        num_chunks = math.ceil(duration_seconds / chunk_length_seconds)
-        
-        tasks = []
-        for i in range(num_chunks):
-            start_time = i * chunk_length_seconds
-            chunk_command = [ FFMPEG_PATH, '-i', temp_out_path, '-ss', str(start_time), '-t', str(chunk_length_seconds), '-f', 'wav', 'pipe:1' ]
-            process = subprocess.run(chunk_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            wav_data = process.stdout
-            if wav_data:
-                # Create a task for each chunk
-                tasks.append(process_chunk_async(wav_data))
-
-        # --- NEW: Step 3: Run all chunk processing tasks in parallel ---
-        chunk_results = await asyncio.gather(*tasks)
-        
-        # Step 4: Stitch the results together in order
-        full_transcript = ""
-        total_word_count = 0
-        for result in chunk_results:
-            full_transcript += result.get("DisplayText", "") + " "
-            total_word_count += len(result.get("NBest", [{}])[0].get("Words", []))
-
-        full_transcript = full_transcript.strip()
-        if not full_transcript:
-            raise HTTPException(status_code=400, detail="Could not detect any speech in the audio.")
-
-        # Step 5: Final analysis with the full transcript (same as before)
-        ai_coach_analysis = get_ai_coach_feedback(full_transcript, topic, duration_seconds, total_word_count)
-        
-        final_result = {
-            "mode": "impromptu-chunked",
-            "transcript": full_transcript,
-            "azureMetrics": {"wordCount": total_word_count, "duration": duration_seconds},
-            "aiCoachAnalysis": ai_coach_analysis
-        }
-        return JSONResponse(content=final_result)
+    # Step 1: Convert to WAV in memory (the upload is piped straight into ffmpeg) and get duration
+    full_wav_data = await convert_audio_with_ffmpeg(audio_file)
+    duration_seconds = get_wav_duration(full_wav_data)
 
-    finally:
-        # Step 6: Clean up temporary files (same as before)
-        os.remove(temp_in_path)
-        os.remove(temp_out_path)
+    # Step 2: Create audio chunks by slicing the PCM in memory (no ffmpeg, no temp files)
+    chunk_length_seconds = 45
+    chunk_wavs = split_wav(full_wav_data, chunk_length_seconds)
 
-# --- NEW: BATCH ANALYSIS ENDPOINT WITH ENHANCED LOGGING ---
+    # --- NEW: Step 3: Run all chunk processing tasks in parallel ---
+    # The TaskGroup cancels the remaining chunks as soon as one fails (a bad key or quota error
+    # will fail every chunk) and also when this request itself is cancelled
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(process_chunk_async(wav_data)) for wav_data in chunk_wavs if wav_data]
+    except ExceptionGroup as e:
+        raise e.exceptions[0]
+    chunk_results = [task.result() for task in tasks]
+    
+    # Step 4: Stitch the results together in order
+    full_transcript = " ".join(display_text for display_text, _ in chunk_results).strip()
+    total_word_count = sum(word_count for _, word_count in chunk_results)
+    if not full_transcript:
+        raise HTTPException(status_code=400, detail="Could not detect any speech in the audio.")
+
+    # Step 5: Final analysis with the full transcript (same as before)
+    ai_coach_analysis = await get_ai_coach_feedback(full_transcript, topic, duration_seconds, total_word_count)
+    
+    final_result = {
+        "mode": "impromptu-chunked",
+        "transcript": full_transcript,
+        "azureMetrics": {"wordCount": total_word_count, "duration": duration_seconds},
+        "aiCoachAnalysis": ai_coach_analysis
+    }
+    return ORJSONResponse(content=final_result)
+
+# --- NEW: BATCH ANALYSIS ENDPOINT ---
 @app.post("/api/analyze-batch/start")
 async def start_batch_analysis(audio_file: UploadFile = File(...)):
     """Starts a batch transcription job for a long audio file."""
-    wav_data = convert_audio_with_ffmpeg(await audio_file.read())
-    audio_url = await upload_audio_to_blob(wav_data)
+    wav_data = await convert_audio_with_ffmpeg(audio_file)
+    # The blob is read by Azure's batch service as a standalone file, so it needs a complete header
+    audio_url = await upload_audio_to_blob(fill_wav_header_sizes(wav_data))
 
     batch_transcription_endpoint = f"https://{AZURE_SPEECH_REGION}.api.cognitive.microsoft.com/speechtotext/v3.1/transcriptions"
     
@@ -313,58 +728,161 @@ async def start_batch_analysis(audio_file: UploadFile = File(...)):
     }
     headers = {'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY, 'Content-Type': 'application/json'}
     
-    response = requests.post(batch_transcription_endpoint, headers=headers, json=payload)
+    response = await http_client.post(batch_transcription_endpoint, headers=headers, json=payload)
     
-    # ENHANCED LOGGING: We will now see the exact error from Azure
     if response.status_code != 201:
-        print("\n" + "#"*50)
-        print("### AZURE BATCH API FAILED TO START JOB ###")
-        print(f"### STATUS CODE: {response.status_code}")
-        print(f"### RESPONSE BODY: {response.text}")
-        print("#"*50 + "\n")
+        logger.error("Azure Batch API failed to start job: status %d, body %s", response.status_code, response.text)
         raise HTTPException(status_code=response.status_code, detail=f"Azure Batch API Error: {response.text}")
     
-    job_url = response.json()["self"]
+    job_url = orjson.loads(response.content)["self"]
     job_id = job_url.split('/')[-1]
     
     return {"jobId": job_id}
 
-@app.get("/api/analyze-batch/status")
-async def get_batch_status(job_id: str):
-    """Polls the status of an ongoing batch transcription job."""
+BATCH_TERMINAL_STATUSES = {"Succeeded", "Failed"}
+
+# Several browser tabs or watchers of the same job share one upstream status call per interval
+BATCH_STATUS_CACHE_TTL_SECONDS = 2
+batch_status_cache = TTLCache(maxsize=1024, ttl=BATCH_STATUS_CACHE_TTL_SECONDS)
+_batch_status_requests = {}
+
+async def fetch_batch_status(job_id: str) -> dict:
+    """Returns the current state of a batch job, coalescing concurrent and back-to-back polls."""
+    job_status = batch_status_cache.get(job_id)
+    if job_status is not None:
+        return job_status
+    request = _batch_status_requests.get(job_id)
+    if request is None:
+        request = asyncio.create_task(request_batch_status(job_id))
+        _batch_status_requests[job_id] = request
+        request.add_done_callback(lambda _: _batch_status_requests.pop(job_id, None))
+    # Shielded so one caller disconnecting doesn't cancel the request the others are waiting on
+    return await asyncio.shield(request)
+
+async def request_batch_status(job_id: str) -> dict:
+    """Fetches the current state of a batch transcription job from Azure."""
     status_endpoint = f"https://{AZURE_SPEECH_REGION}.api.cognitive.microsoft.com/speechtotext/v3.1/transcriptions/{job_id}"
     headers = {'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY}
-    response = requests.get(status_endpoint, headers=headers)
+    response = await http_client.get(status_endpoint, headers=headers)
     response.raise_for_status()
-    return response.json()
+    job_status = orjson.loads(response.content)
+    batch_status_cache[job_id] = job_status
+    if job_status.get("status") == "Succeeded":
+        prefetch_batch_results(job_id)
+    return job_status
 
-@app.get("/api/analyze-batch/results")
-async def get_batch_results(job_id: str, topic: str):
-    """Fetches the final results of a completed batch job and analyzes them."""
+@app.get("/api/analyze-batch/status")
+async def get_batch_status(job_id: str):
+    """Polls the status of an ongoing batch transcription job."""
+    return await fetch_batch_status(job_id)
+
+# Upper bound on how long one /await request may hold a connection open and keep polling Azure
+BATCH_AWAIT_MAX_SECONDS = 600
+
+@app.get("/api/analyze-batch/await")
+async def await_batch_completion(job_id: str, timeout_seconds: float = Query(BATCH_AWAIT_MAX_SECONDS, gt=0, le=BATCH_AWAIT_MAX_SECONDS)):
+    """Waits server-side until the batch job finishes, so the client makes one request instead of polling."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+    delay = 1.0
+    while True:
+        job_status = await fetch_batch_status(job_id)
+        # Give up waiting before the next sleep would overrun the deadline; the caller sees the latest status
+        if job_status.get("status") in BATCH_TERMINAL_STATUSES or loop.time() + delay > deadline:
+            return job_status
+        # Jitter keeps many waiters from polling Azure in lockstep
+        await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+        delay = min(delay * 1.5, 10.0)
+
+@app.get("/api/analyze-batch/stream")
+async def stream_batch_status(job_id: str):
+    """Pushes batch job status as Server-Sent Events until the job finishes, instead of the client polling /status."""
+    # The first poll happens before any bytes are sent, so an unknown job or Azure error is a normal HTTP error
+    # rather than a dropped stream that EventSource would keep reconnecting to
+    try:
+        job_status = await fetch_batch_status(job_id)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Azure Batch API Error: {e.response.text}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Azure Batch API Error: {str(e)}")
+
+    async def status_events():
+        nonlocal job_status
+        delay = 2.0
+        while True:
+            yield b"data: " + orjson.dumps(job_status) + b"\n\n"
+            if job_status.get("status") in BATCH_TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 1.5, 15.0)
+            try:
+                job_status = await fetch_batch_status(job_id)
+            except httpx.HTTPError as e:
+                # Headers are already sent; tell the client and end the stream instead of dropping the connection
+                yield b"event: error\ndata: " + orjson.dumps({"detail": f"Azure Batch API Error: {str(e)}"}) + b"\n\n"
+                return
+
+    return StreamingResponse(status_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def fetch_batch_result_content(job_id: str) -> dict:
+    """Downloads and parses the transcription result file of a finished batch job."""
     results_endpoint = f"https://{AZURE_SPEECH_REGION}.api.cognitive.microsoft.com/speechtotext/v3.1/transcriptions/{job_id}/files"
     headers = {'Ocp-Apim-Subscription-Key': AZURE_SPEECH_KEY}
-    response = requests.get(results_endpoint, headers=headers)
+    response = await http_client.get(results_endpoint, headers=headers)
     response.raise_for_status()
     
-    files = response.json().get("values", [])
+    files = orjson.loads(response.content).get("values", [])
     if not files:
         raise HTTPException(status_code=404, detail="Transcription result files not found.")
         
     result_file_url = files[0]["links"]["contentUrl"]
-    result_content = requests.get(result_file_url).json()
+    result_response = await http_client.get(result_file_url)
+    # orjson holds the GIL while it builds the objects, so a worker thread wouldn't free the event loop;
+    # parsing inline at least skips the thread hop, and orjson keeps even multi-MB files quick
+    return orjson.loads(result_response.content)
+
+# Download tasks by job id, started as soon as any status poll sees the job succeed,
+# so the client's follow-up /results call finds the file already fetched.
+# Parsed results of long recordings are large, so only a few are held, briefly, until /results takes them.
+BATCH_RESULT_PREFETCH_TTL_SECONDS = 300
+batch_result_tasks = TTLCache(maxsize=16, ttl=BATCH_RESULT_PREFETCH_TTL_SECONDS)
+
+def log_prefetch_failure(job_id: str, task: asyncio.Task):
+    """Retrieves a prefetch task's exception, so a failure nobody awaits is logged here instead of by asyncio."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Prefetching results for batch job %s failed", job_id, exc_info=task.exception())
+
+def prefetch_batch_results(job_id: str) -> asyncio.Task:
+    """Returns the download task for a job's results, starting it if needed."""
+    task = batch_result_tasks.get(job_id)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        # A failed download is retried instead of replaying the failure
+        task = asyncio.create_task(fetch_batch_result_content(job_id))
+        task.add_done_callback(lambda done_task: log_prefetch_failure(job_id, done_task))
+        batch_result_tasks[job_id] = task
+    return task
+
+@app.get("/api/analyze-batch/results")
+async def get_batch_results(job_id: str, topic: str):
+    """Fetches the final results of a completed batch job and analyzes them."""
+    result_content = await asyncio.shield(prefetch_batch_results(job_id))
+    batch_result_tasks.pop(job_id, None)
     
-    # --- THIS IS THE FIX ---
-    # The batch API result uses the "display" key for the transcript, not "lexical".
+    # Collect transcript, duration and word count in a single pass over the phrases
     transcript_phrases = []
+    duration_ticks = 0
+    word_count = 0
     for phrase in result_content.get("recognizedPhrases", []):
+        # --- THIS IS THE FIX ---
+        # The batch API result uses the "display" key for the transcript, not "lexical".
         transcript_phrases.append(phrase.get("display", ""))
+        duration_ticks += phrase.get("durationInTicks", 0)
+        # Word-level timestamps are enabled for the job, so count Azure's recognized words instead of re-tokenizing the transcript
+        word_count += len(phrase.get("nBest", [{}])[0].get("words", []))
     transcript = " ".join(transcript_phrases)
+    duration_seconds = duration_ticks / 10000000.0
     
-    # The rest of the function remains the same
-    duration_seconds = sum([phrase.get("durationInTicks", 0) for phrase in result_content.get("recognizedPhrases", [])]) / 10000000.0
-    word_count = len(transcript.split())
-    
-    ai_coach_analysis = get_ai_coach_feedback(transcript, topic, duration_seconds, word_count)
+    ai_coach_analysis = await get_ai_coach_feedback(transcript, topic, duration_seconds, word_count)
 
     final_result = {
         "mode": "impromptu-batch",
@@ -372,7 +890,7 @@ async def get_batch_results(job_id: str, topic: str):
         "azureMetrics": {"wordCount": word_count, "duration": duration_seconds},
         "aiCoachAnalysis": ai_coach_analysis
     }
-    return JSONResponse(content=final_result)
+    return ORJSONResponse(content=final_result)
 
 # --- THIS MUST BE THE LAST ROUTE DEFINITION ---
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
\ No newline at end of file
@@ -0,0 +1,60 @@
+import struct
+
+from main import WAV_BYTES_PER_SECOND, fill_wav_header_sizes, get_wav_duration, split_wav
+
+
+def make_wav(pcm: bytes, data_size=None, trailer: bytes = b"") -> bytes:
+    """Builds a 16 kHz mono 16-bit WAV, optionally with a placeholder data size and trailing chunks."""
+    if data_size is None:
+        data_size = len(pcm)
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(pcm) + len(trailer), b'WAVE', b'fmt ', 16, 1, 1, 16000, WAV_BYTES_PER_SECOND, 2, 16, b'data', data_size)
+    return header + pcm + trailer
+
+
+def list_chunk(size: int) -> bytes:
+    return struct.pack('<4sI', b'LIST', size) + b'\x00' * size
+
+
+def test_pipe_header_uses_the_bytes_present():
+    # ffmpeg writing to a pipe leaves the data size as 0xFFFFFFFF
+    wav = make_wav(b'\x01\x00' * 16000 * 50, data_size=0xFFFFFFFF)
+    assert get_wav_duration(wav) == 50.0
+    chunks = split_wav(wav, 45)
+    assert [len(chunk) - 44 for chunk in chunks] == [45 * WAV_BYTES_PER_SECOND, 5 * WAV_BYTES_PER_SECOND]
+
+
+def test_trailing_chunk_is_not_audio():
+    wav = make_wav(b'\x01\x00' * 16000 * 45, trailer=list_chunk(4000))
+    assert get_wav_duration(wav) == 45.0
+    chunks = split_wav(wav, 45)
+    assert len(chunks) == 1
+    assert chunks[0][44:] == wav[44:44 + 45 * WAV_BYTES_PER_SECOND]
+
+
+def test_split_chunks_are_standalone_wavs():
+    wav = make_wav(b'\x02\x00' * 16000 * 3)
+    for chunk in split_wav(wav, 1):
+        riff_size, = struct.unpack_from('<I', chunk, 4)
+        data_size, = struct.unpack_from('<I', chunk, 40)
+        assert riff_size == len(chunk) - 8
+        assert data_size == len(chunk) - 44 == WAV_BYTES_PER_SECOND
+
+
+def test_missing_data_chunk():
+    assert get_wav_duration(b'RIFF\x04\x00\x00\x00WAVE') == 0.0
+    assert split_wav(b'RIFF\x04\x00\x00\x00WAVE', 45) == []
+
+
+def test_fill_wav_header_sizes_replaces_pipe_placeholders():
+    pcm = b'\x01\x00' * 16000
+    wav = make_wav(pcm, data_size=0xFFFFFFFF)
+    wav = wav[:4] + struct.pack('<I', 0xFFFFFFFF) + wav[8:]
+    filled = fill_wav_header_sizes(wav)
+    assert struct.unpack_from('<I', filled, 4)[0] == len(wav) - 8
+    assert struct.unpack_from('<I', filled, 40)[0] == len(pcm)
+    assert filled[44:] == pcm
+
+
+def test_fill_wav_header_sizes_keeps_complete_headers():
+    wav = make_wav(b'\x01\x00' * 100, trailer=list_chunk(10))
+    assert fill_wav_header_sizes(wav) is wav